@@ -70,7 +70,10 @@ class PiNN_calc(Calculator):
 
         The properties and system_changes are ignored here since we do
         not want to reset the predictor frequently. Whenever
-        calculator is executed, the predictor is run. The calculate
+        calculator is executed, the predictor is run. The predictor
+        is a single long-lived estimator.predict generator fed by
+        self._generator, so the graph is built and the checkpoint is
+        restored only once (or when the PBC condition changes). The calculate
         method will not be executed if atoms are not changed since
         last run (this should be haneled by
         ase.calculator.Calculator).
@@ -81,6 +84,8 @@ class PiNN_calc(Calculator):
 
         if self._atoms_to_calc.pbc.any() != self.pbc and self.predictor:
             print('PBC condition changed, reset the predictor.')
+            # closing the generator releases the session of the old predictor
+            self.predictor.close()
             self.predictor = None
 
         predictor = self.get_predictor()
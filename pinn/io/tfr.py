@@ -16,6 +16,8 @@ def write_tfrecord(fname, dataset, log_every=100, pre_fn=None):
     Args:
         dataset (Dataset): input dataset.
         fname (str): filename of the dataset to be saved.
+        pre_fn (function): optional, preprocessing function mapped
+            (in parallel) over the dataset before writing.
     """
     def _bytes_feature(value):
         """Returns a bytes_list from a string / byte."""
@@ -23,10 +25,9 @@ def write_tfrecord(fname, dataset, log_every=100, pre_fn=None):
     # Preperation
     tfr = '.'.join(fname.split('.')[:-1]+['tfr'])
     writer = tf.python_io.TFRecordWriter(tfr)
-    tensors = dataset.make_one_shot_iterator().get_next()
     if pre_fn:
-        tensors = pre_fn(tensors)
-        dataset = dataset.map(pre_fn)
+        dataset = dataset.map(pre_fn, tf.data.experimental.AUTOTUNE)
+    tensors = dataset.make_one_shot_iterator().get_next()
     types = dataset.output_types
     shapes = dataset.output_shapes
     # Sanity check
@@ -62,15 +63,25 @@ def write_tfrecord(fname, dataset, log_every=100, pre_fn=None):
         yaml.safe_dump({'format': format_dict, 'info': info_dict}, f)
 
 
-def load_tfrecord(fname):
+def load_tfrecord(fname, num_parallel_reads=8, buffer_size=8 << 20):
     """Load tfrecord dataset.
 
+    fname can also be a glob pattern matching several .yml files with
+    the same format (e.g. shards of one dataset), the corresponding
+    .tfr files are then read in parallel.
+
     Args:
-       fname (str): filename of the .yml metadata file to be loaded.
-       dtypes (dict): dtype of dataset.
+       fname (str): filename (or pattern) of the .yml metadata file to be loaded.
+       num_parallel_reads (int): number of .tfr files to read concurrently.
+       buffer_size (int): read buffer size of each .tfr file, in bytes.
     """
+    if any(c in fname for c in '*?['):
+        fnames = sorted(tf.io.gfile.glob(fname))
+        assert fnames, "No file matches {}.".format(fname)
+    else:
+        fnames = [fname]
     # dataset
-    with FileIO(fname, 'r') as f:
+    with FileIO(fnames[0], 'r') as f:
         format_dict = (yaml.safe_load(f)['format'])
     dtypes = {k: format_dict[k]['dtype'] for k in format_dict.keys()}
     shapes = {k: format_dict[k]['shape'] for k in format_dict.keys()}
@@ -84,6 +95,14 @@ def load_tfrecord(fname):
                    for k, v in tensors.items()}
         [v.set_shape(shapes[k]) for k, v in tensors.items()]
         return tensors
-    tfr = '.'.join(fname.split('.')[:-1]+['tfr'])
-    dataset = tf.data.TFRecordDataset(tfr).map(parser).map(converter)
+    tfrs = ['.'.join(f.split('.')[:-1]+['tfr']) for f in fnames]
+    autotune = tf.data.experimental.AUTOTUNE
+    if len(tfrs) == 1:
+        dataset = tf.data.TFRecordDataset(tfrs[0], buffer_size=buffer_size)
+    else:
+        dataset = tf.data.Dataset.from_tensor_slices(tfrs).interleave(
+            lambda tfr: tf.data.TFRecordDataset(tfr, buffer_size=buffer_size),
+            cycle_length=min(len(tfrs), num_parallel_reads),
+            num_parallel_calls=autotune)
+    dataset = dataset.map(parser, autotune).map(converter, autotune)
     return dataset
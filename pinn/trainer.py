@@ -13,8 +13,10 @@ Example usage of ``pinn_train`` on a local machine::
 
     pinn_trian --model-dir=my_model --params=params.yml \\
                --train-data=train.yml --eval-data=test.yml \\
-               --max-steps=1e6 --eval-steps=100 \\
-               --cache-data=True
+               --max-steps=1e6 --eval-steps=100
+
+Boolean options are switches, e.g. the training data is cached by
+default, and ``--no-cache-data`` turns the cache off.
 
 Example usage of ``pinn_train`` on Google Cloud: 
 
@@ -36,46 +38,55 @@ To submit a job on Gcloud::
            --params-file=gs://my-bucket/models/params.yml \\
            --train-data=gs://my-bucket/data/train.yml \\
            --eval-data=gs://my-bucket/data/test.yml \\
-           --train-steps=1000 --cache-data=True
+           --train-steps=1000
 
 """
+import os
+import tempfile
+import yaml
+import tensorflow as tf
+from pinn import networks
+from pinn.models import potential_model
+from pinn.utils import get_atomic_dress
+from pinn.io import load_tfrecord, write_tfrecord, sparse_batch
+try:
+    from yaml import CSafeLoader as Loader
+except ImportError:
+    from yaml import SafeLoader as Loader
+
 
 def trainner(model_dir, params_file,
              train_data, eval_data, train_steps, eval_steps,
              batch_size, preprocess, scratch_dir, cache_data,
              shuffle_buffer, regen_dress):
-    import yaml, tempfile, os
-    import tensorflow as tf
-    from tensorflow.python.lib.io.file_io import FileIO
-    from pinn import networks
-    from pinn.models import potential_model
-    from pinn.utils import get_atomic_dress
-    from pinn.io import load_tfrecord, write_tfrecord, sparse_batch
-
     # Prepare the params or load the model
-    with FileIO(params_file, 'r') as f:
-        params = yaml.load(f)
+    with tf.io.gfile.GFile(params_file, 'rb') as f:
+        params = yaml.load(f.read(), Loader=Loader)
     params['model_dir'] = model_dir
     if regen_dress and 'e_dress' in params['model_params']:
         elems = list(params['model_params']['e_dress'].keys())
-        dress, _ = get_atomic_dress(load_tfrecord(train_data), elems)
+        dataset = load_tfrecord(train_data, buffer_size=16 << 20)
+        dress, _ = get_atomic_dress(dataset, elems, return_error=False)
         params['model_params']['e_dress'] = dress
 
     # Building the datasets
+    if isinstance(params['network'], str):
+        network_fn = getattr(networks, params['network'])
+    else:
+        network_fn = params['network']
+    network_params = dict(params['network_params'])
+    pre_fn = lambda tensors: network_fn(tensors, preprocess=True,
+                                        **network_params)
+
     scratches = []
     def _dataset_fn(fname):
         dataset = load_tfrecord(fname)
         if batch_size is not None:
             dataset = dataset.apply(sparse_batch(batch_size))
         if preprocess:
-            if isinstance(params['network'], str):
-                network_fn = getattr(networks, params['network'])
-            else:
-                network_fn = params['network']            
-            pre_fn = lambda tensors: network_fn(tensors, preprocess=True,
-                                                **params['network_params'])
             if scratch_dir is None:
-                return dataset.map(pre_fn) 
+                return dataset.map(
+                    pre_fn, num_parallel_calls=tf.data.experimental.AUTOTUNE)
             else:
                 _, tmp = tempfile.mkstemp(dir=scratch_dir)
                 scratches.append(tmp)
@@ -84,14 +95,23 @@ def trainner(model_dir, params_file,
         else:
             return dataset
     train_tmp = lambda: _dataset_fn(train_data)
-    eval_fn = lambda: _dataset_fn(eval_data)    
+    eval_tmp = lambda: _dataset_fn(eval_data)
     if scratch_dir is not None and preprocess:
         train_tmp = train_tmp()
-        eval_fn = eval_fn()
-    if cache_data:
-        train_fn = lambda: train_tmp().cache().repeat().shuffle(shuffle_buffer)
-    else:
-        train_fn = lambda: train_tmp().repeat().shuffle(shuffle_buffer)
+        eval_tmp = eval_tmp()
+    autotune = tf.data.experimental.AUTOTUNE
+    options = tf.data.Options()
+    options.experimental_threading.private_threadpool_size = os.cpu_count()
+    def train_fn():
+        dataset = train_tmp()
+        if cache_data:
+            # cache the batched and preprocessed data, before shuffle+repeat,
+            # so that the preprocessing is only done in the first epoch
+            dataset = dataset.cache()
+        # shuffle+repeat is fused by tf.data's shuffle_and_repeat_fusion pass
+        dataset = dataset.shuffle(shuffle_buffer).repeat().prefetch(autotune)
+        return dataset.with_options(options)
+    eval_fn = lambda: eval_tmp().prefetch(autotune).with_options(options)
         
     # Run
     train_spec = tf.estimator.TrainSpec(input_fn=train_fn, max_steps=train_steps)
@@ -127,17 +147,23 @@ def main():
     parser.add_argument('--batch-size',  type=int,
                         help='Batch size to batch, default to None - data already batched',
                         default=None)
-    parser.add_argument('--preprocess',  type=bool,
+    parser.add_argument('--preprocess', dest='preprocess', action='store_true',
                         help='Preprocess the data', default=False)
+    parser.add_argument('--no-preprocess', dest='preprocess', action='store_false',
+                        help='do not preprocess the data', default=argparse.SUPPRESS)
     parser.add_argument('--scratch-dir',  type=str,
                         help='If set in preprocess mode, save the processed dataset to \
                               scratch folder', default=None)
-    parser.add_argument('--cache-data',  type=bool,
+    parser.add_argument('--cache-data', dest='cache_data', action='store_true',
                         help='cache the training data to memory', default=True)
+    parser.add_argument('--no-cache-data', dest='cache_data', action='store_false',
+                        help='do not cache the training data', default=argparse.SUPPRESS)
     parser.add_argument('--shuffle-buffer',  type=int,
                         help='size of shuffle buffer', default=100)    
-    parser.add_argument('--regen-dress', type=bool,
+    parser.add_argument('--regen-dress', dest='regen_dress', action='store_true',
                         help='regenerate atomic dress using the training set', default=True)
+    parser.add_argument('--no-regen-dress', dest='regen_dress', action='store_false',
+                        help='keep the atomic dress in the parameters', default=argparse.SUPPRESS)
     
     args = parser.parse_args()
     trainner(args.model_dir, args.params_file,
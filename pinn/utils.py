@@ -6,16 +6,23 @@ import numpy as np
 from functools import wraps
 
 
-def get_atomic_dress(dataset, elems, max_iter=None):
+def get_atomic_dress(dataset, elems, max_iter=None, return_error=True):
     """Fit the atomic energy with a element dependent atomic dress
 
+    The normal equations of the fit are accumulated batch by batch,
+    the fit then solves a (n_elems x n_elems) linear system. The
+    per-sample data is only kept if the residue error is requested.
+
     Args:
         dataset: dataset to fit
         elems: a list of element numbers
+        max_iter: maximum number of batches to read
+        return_error: whether to compute the residue error
     Returns:
         atomic_dress: a dictionary comprising the atomic energy of each element
-        error: residue error of the atomic dress
+        error: residue error of the atomic dress, None if return_error is False
     """
+    dataset = dataset.prefetch(tf.data.experimental.AUTOTUNE)
     tensors = dataset.make_one_shot_iterator().get_next()
     if 'ind_1' not in tensors:
         tensors['ind_1'] = tf.expand_dims(tf.zeros_like(tensors['elems']), 1)
@@ -25,6 +32,8 @@ def get_atomic_dress(dataset, elems, max_iter=None):
     count = tf.cast(count, tf.int32)
     count = tf.segment_sum(count, tensors['ind_1'][:, 0])
     sess = tf.Session()
+    xtx = np.zeros([len(elems), len(elems)])
+    xty = np.zeros([len(elems)])
     x, y = [], []
     it = 0
     while True:
@@ -33,13 +42,18 @@ def get_atomic_dress(dataset, elems, max_iter=None):
             break
         try:
             x_i, y_i = sess.run((count, tensors['e_data']))
-            x.append(x_i)
-            y.append(y_i)
+            xtx += np.dot(x_i.T, x_i)
+            xty += np.dot(x_i.T, y_i)
+            if return_error:
+                x.append(x_i)
+                y.append(y_i)
         except tf.errors.OutOfRangeError:
             break
-    x, y = np.concatenate(x, 0), np.concatenate(y, 0)
-    beta = np.dot(np.dot(np.linalg.pinv(np.dot(x.T, x)), x.T), np.array(y))
+    beta = np.dot(np.linalg.pinv(xtx), xty)
     dress = {e: float(beta[i]) for (i, e) in enumerate(elems)}
+    if not return_error:
+        return dress, None
+    x, y = np.concatenate(x, 0), np.concatenate(y, 0)
     error = np.dot(x, beta) - y
     return dress, error
 
@@ -87,3 +87,22 @@ def test_write():
         out = sess.run(ds_batch_tfr.make_one_shot_iterator().get_next())
         for k in out.keys():
             assert_almost_equal(label[k], out[k])
+
+
+def test_write_shards():
+    from pinn.io import load_tfrecord, write_tfrecord
+    ds = get_trivial_runner_ds()
+    write_tfrecord('test_shard_0.yml', ds.repeat(20))
+    write_tfrecord('test_shard_1.yml', ds.repeat(10))
+    ds_tfr = load_tfrecord('test_shard_*.yml')
+
+    label = ds.make_one_shot_iterator().get_next()
+    item = ds_tfr.make_one_shot_iterator().get_next()
+    with tf.Session() as sess:
+        label = sess.run(label)
+        for i in range(30):
+            out = sess.run(item)
+            for k in out.keys():
+                assert_almost_equal(label[k], out[k])
+        with pytest.raises(OutOfRangeError):
+            out = sess.run(item)
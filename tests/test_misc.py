@@ -138,3 +138,37 @@ def test_clist_nl():
     assert np.all(np.sort(dist_ase)-np.sort(dist_pinn)<1e-4)
     
 
+
+
+def test_atomic_dress():
+    """Fit the atomic dress on a batched dataset and compare with a
+    least squares fit on the full design matrix
+    """
+    from pinn.io import load_numpy, sparse_batch
+    from pinn.utils import get_atomic_dress
+    rand = np.random.RandomState(0)
+    elems = rand.choice([0, 1, 8], size=[40, 4])
+    elems[:, 0] = rand.choice([1, 8], size=40)
+    x = np.stack([np.sum(elems == 1, 1), np.sum(elems == 8, 1)], 1)
+    e_data = np.dot(x, [-0.5, -75.0]) + rand.normal(0, 0.01, 40)
+    data = {'elems': elems, 'coord': np.zeros([40, 4, 3]), 'e_data': e_data}
+    y = e_data.astype(np.float32).astype(float)
+    beta = np.linalg.lstsq(x, y, rcond=None)[0]
+
+    dataset = lambda: load_numpy(data, split=1, shuffle=False)\
+        .apply(sparse_batch(10))
+    with tf.Graph().as_default():
+        dress, error = get_atomic_dress(dataset(), [1, 8])
+    assert np.allclose([dress[1], dress[8]], beta, rtol=1e-4)
+    assert np.allclose(error, np.dot(x, beta) - y, atol=1e-3)
+
+    with tf.Graph().as_default():
+        dress_noerr, error = get_atomic_dress(dataset(), [1, 8],
+                                              return_error=False)
+    assert error is None
+    assert np.allclose([dress_noerr[1], dress_noerr[8]],
+                       [dress[1], dress[8]])
+
+    with tf.Graph().as_default():
+        _, error = get_atomic_dress(dataset(), [1, 8], max_iter=2)
+    assert error.shape == (20,)
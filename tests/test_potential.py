@@ -8,6 +8,10 @@ from pinn.io import load_numpy, sparse_batch
 from helpers import assert_almost_equal
 from shutil import rmtree
 from ase import Atoms
+try:
+    from numpy import trapezoid
+except ImportError:  # numpy < 2.0
+    from numpy import trapz as trapezoid
 
 
 def test_pinn_potential():
@@ -106,28 +110,68 @@ def test_bpnn_potential_pre_cond():
     rmtree(testpath)
 
 
-def _get_lj_data():
+def test_lj_reference():
+    # The vectorized LJ reference should agree with ASE
     from ase.calculators.lj import LennardJones
 
-    atoms = Atoms('H3', positions=[[0, 0, 0], [0, 1, 0], [1, 1, 0]])
+    data = _get_lj_data()
+    atoms = Atoms('H3')
     atoms.set_calculator(LennardJones(rc=5.0))
-    coord, elems, e_data, f_data = [], [], [], []
-    for x_a in np.linspace(-5, 0, 1000):
-        atoms.positions[0, 0] = x_a
-        coord.append(atoms.positions.copy())
-        elems.append(atoms.numbers)
-        e_data.append(atoms.get_potential_energy())
-        f_data.append(atoms.get_forces())
+    for i in range(0, 1000, 50):
+        atoms.positions = data['coord'][i]
+        assert_almost_equal(atoms.get_potential_energy(), data['e_data'][i])
+        assert_almost_equal(atoms.get_forces(), data['f_data'][i])
+
+
+def _lj_numpy(coord, rc=5.0):
+    # LJ energies and forces (sigma = epsilon = 1) of a batch of structures,
+    # the pair energy is shifted to zero at rc, as in ASE's LennardJones
+    diff = coord[:, None, :, :] - coord[:, :, None, :]
+    r2 = np.sum(diff**2, axis=-1)
+    pair = (r2 <= rc**2) & ~np.eye(coord.shape[1], dtype=bool)
+    c6 = np.where(pair, 1/np.where(pair, r2, 1.)**3, 0.)
+    c12 = c6**2
+    e0 = 4*(rc**-12 - rc**-6)
+    e_data = np.sum(4*(c12 - c6) - e0*pair, axis=(1, 2))/2
+    f_data = -np.sum((24*(2*c12 - c6)/np.where(pair, r2, 1.))[:, :, :, None]
+                     * diff, axis=2)
+    return e_data, f_data
+
+
+def _get_lj_data():
+    n_sample = 1000
+    coord = np.empty((n_sample, 3, 3))
+    coord[:] = [[0, 0, 0], [0, 1, 0], [1, 1, 0]]
+    coord[:, 0, 0] = np.linspace(-5, 0, n_sample)
+    e_data, f_data = _lj_numpy(coord)
 
     data = {
-        'coord': np.array(coord),
-        'elems': np.array(elems),
-        'e_data': np.array(e_data),
-        'f_data': np.array(f_data)
+        'coord': coord,
+        'elems': np.ones((n_sample, 3), np.int64),
+        'e_data': e_data,
+        'f_data': f_data
     }
     return data
 
 
+def _batched_predict(model, coords):
+    # Predict the energies and forces of H3 structures, each array in coords
+    # forms one batch and all batches go through a single predictor
+    def dataset():
+        batches = [load_numpy({'coord': coord,
+                               'elems': np.ones(coord.shape[:2], np.int64)},
+                              split=1, shuffle=False)
+                   .apply(sparse_batch(coord.shape[0])) for coord in coords]
+        dataset = batches[0]
+        for batch in batches[1:]:
+            dataset = dataset.concatenate(batch)
+        return dataset
+    predictor = model.predict(dataset, predict_keys=['energy', 'forces'],
+                              yield_single_examples=False)
+    return [(pred['energy'], pred['forces'].reshape(coord.shape))
+            for coord, pred in zip(coords, predictor)]
+
+
 def _potential_tests(params):
     # Series of tasks that a potential should pass
 
@@ -146,23 +190,16 @@ def _potential_tests(params):
     model = potential_model(params)
     results, _ = tf.estimator.train_and_evaluate(model, train_spec, eval_spec)
 
-    # The calculator should be accessable with model_dir
-    atoms = Atoms('H3', positions=[[0, 0, 0], [0, 1, 0], [1, 1, 0]])
-    calc = PiNN_calc(potential_model(params['model_dir']),
-                     properties=['energy', 'forces', 'stress'])
+    # Predict the training set and the energy conservation sweep at once
+    x_a_range = np.linspace(-6, -3, 500)
+    coord = np.empty((500, 3, 3))
+    coord[:] = [[0, 0, 0], [0, 1, 0], [1, 1, 0]]
+    coord[:, 0, 0] = x_a_range
+    (e_pred, f_pred), (e_cons, f_cons) = _batched_predict(
+        model, [data['coord'], coord])
 
     # Test energy dress and scaling
     # Make sure we have the correct error reports
-    e_pred, f_pred = [], []
-    for coord in data['coord']:
-        atoms.positions = coord
-        calc.calculate(atoms)
-        e_pred.append(calc.get_potential_energy())
-        f_pred.append(calc.get_forces())
-
-    f_pred = np.array(f_pred)
-    e_pred = np.array(e_pred)
-
     assert_almost_equal(results['METRICS/F_RMSE']/params['model_params']['e_scale'],
                         np.sqrt(np.mean((f_pred/params['model_params']['e_unit']
                                          - data['f_data'])**2)))
@@ -171,32 +208,34 @@ def _potential_tests(params):
                                          - data['e_data'])**2)))
 
     # Test energy conservation
-    e_pred, f_pred = [], []
-    x_a_range = np.linspace(-6, -3, 500)
-    for x_a in np.linspace(-6, -3, 500):
-        atoms.positions[0, 0] = x_a
-        calc.calculate(atoms)
-        e_pred.append(calc.get_potential_energy())
-        f_pred.append(calc.get_forces())
-    e_pred = np.array(e_pred)
-    f_pred = np.array(f_pred)
-
-    de = e_pred[-1] - e_pred[0]
-    int_f = np.trapz(f_pred[:, 0, 0], x=x_a_range)
+    de = e_cons[-1] - e_cons[0]
+    int_f = trapezoid(f_cons[:, 0, 0], x=x_a_range)
     assert_almost_equal(de, -int_f)
 
+    # The calculator should be accessable with model_dir
+    atoms = Atoms('H3', positions=[[0, 0, 0], [0, 1, 0], [1, 1, 0]])
+    calc = PiNN_calc(potential_model(params['model_dir']),
+                     properties=['energy', 'forces', 'stress'])
+    # and agree with the batched predictions (including dress and units)
+    for i in range(0, 1000, 100):
+        calc.calculate(Atoms('H3', positions=data['coord'][i]))
+        np.testing.assert_allclose(calc.get_potential_energy(), e_pred[i],
+                                   rtol=1e-4, atol=1e-4)
+        np.testing.assert_allclose(calc.get_forces(), f_pred[i],
+                                   rtol=1e-4, atol=1e-4)
+
     # Test virial pressure
-    e_pred, p_pred = [], []
     l_range = np.linspace(3, 3.5, 500)
-    atoms.positions[0, 0] = 0
+    v_range = l_range**3
+    e_pred, p_pred = np.empty(500), np.empty(500)
     atoms.set_cell([3, 3, 3])
     atoms.set_pbc(True)
-    for l in l_range:
+    for i, l in enumerate(l_range):
         atoms.set_cell([l, l, l], scale_atoms=True)
         calc.calculate(atoms)
-        e_pred.append(calc.get_potential_energy())
-        p_pred.append(np.sum(calc.get_stress()[:3])/3)
+        e_pred[i] = calc.get_potential_energy()
+        p_pred[i] = np.sum(calc.get_stress()[:3])/3
 
     de = e_pred[-1] - e_pred[0]
-    int_p = np.trapz(p_pred, x=l_range**3)
+    int_p = trapezoid(p_pred, x=v_range)
     assert_almost_equal(de, int_p)